@@ -20,9 +20,9 @@ from .testfunctions import test_function
 # We know if a function has annotations because all annotations are
 # passed through the _decorator function (so that we can ensure we
 # only use at most one more stack frame no matter how many function
-# annotations we have).  The _decorator function will look for the
-# global variable __ALL_FUNCTIONS to be defined within the verify
-# module.  If it is defined, it will add one copy of each decorated
+# annotations we have).  The _decorator function will look at the
+# global variable _ALL_FUNCTIONS within the decorators module.  If it
+# is a list rather than None, it will add one copy of each decorated
 # function to the list.  Then, we can perform the unit test by
 # iterating through each of these.  This has the advantage of allowing
 # nested functions and object methods to be discovered for
@@ -32,9 +32,9 @@ if __name__ == "__main__":
     # len == 2 if the path to the module is arg 1.
     if not (len(sys.argv) == 2 or (len(sys.argv) == 3 and sys.argv[1] == "-m")):
         exit("Invalid argument, please pass a python file or '-m modulename'")
-    # Add the __ALL_FUNCTIONS to the global scope of the verify module
-    # and then run the script.  Save the global variables from script
-    # execution so that we can find the __ALL_FUNCTIONS variable once
+    # Set _ALL_FUNCTIONS in the decorators module to a list and then
+    # run the script.  Save the global variables from script
+    # execution so that we can find the _ALL_FUNCTIONS variable once
     # the script has finished executing.
     globs = {} # Global variables from script execution
     # Get the script file's text
@@ -45,13 +45,13 @@ if __name__ == "__main__":
         script_contents = open(sys.argv[1], "r").read()
         name = sys.argv[1]
     # Include the paranoid code in a predictable way
-    prefix = "import paranoid as __paranoidmod;__paranoidmod.decorators.__ALL_FUNCTIONS = [];"
+    prefix = "import paranoid as __paranoidmod;__paranoidmod.decorators._ALL_FUNCTIONS = [];"
     # Get rid of relative imports
     script_contents = re.sub(r'from\s+\.([A-Za-z0-9_\.]+)\s+import', r'from \1 import', script_contents)
     script_contents = re.sub(r'from\s+\.\s+import', r'import', script_contents)
     # Execute to find the functions and save them.
     exec(prefix + script_contents, globs)
-    all_functions = globs["__paranoidmod"].decorators.__ALL_FUNCTIONS
+    all_functions = globs["__paranoidmod"].decorators._ALL_FUNCTIONS
     # Test each function from the script.
     untested = []
     for f in all_functions:
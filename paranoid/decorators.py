@@ -8,9 +8,12 @@
 
 __all__ = ['accepts', 'requires', 'returns', 'ensures', 'paranoidclass', 'paranoidconfig']
 import functools, itertools
-import inspect
-from random import randint
-from copy import deepcopy
+import ast
+import builtins
+import re
+import sys
+import types
+from random import random
 from . import utils as U
 from .types import base as T
 from .types.collections import Dict, List
@@ -21,128 +24,425 @@ from .settings import Settings
 # Constants used internally
 _BT = "__BACKTICK__"
 _RET = "__RETURN__"
-
-
-def _check_accepts(func, argvals):
-    # @accepts decorator
-    if U.has_fun_prop(func, "argtypes"):
-        argtypes = U.get_fun_prop(func, "argtypes")
-        if sorted(argtypes.keys()) != sorted(argvals.keys()):
+# Attributes copied from the function to its wrapper, including the
+# function properties and local settings
+_WRAPPER_ASSIGN = functools.WRAPPER_ASSIGNMENTS + \
+                  (U._FUN_PROPS, Settings.FUNCTION_SETTINGS_NAME)
+# The list of decorated functions, when running "python3 -m paranoid
+# scriptname.py".  This is set to a list by __main__.
+_ALL_FUNCTIONS = None
+
+# The parts of a condition which need special treatment: string
+# literals (left alone, except for the replacement fields of
+# f-strings), the implies notation, and names, which may be followed
+# by backticks.
+_CONDITION_TOKEN = re.compile(r"""(?P<string>(?P<prefix>[rRbBuUfF]{0,2})"""
+                              r"""(?:'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"))"""
+                              r"""|(?P<implies><-->|-->)"""
+                              r"""|(?P<name>[^\W\d]\w*)(?P<backticks>`*)""")
+
+def _parse_condition(condition, func):
+    """Parse the text of a condition into an AST expression.
+
+    Conditions are Python expressions, except that they may be of the
+    form "a --> b" (if a then b) or "a <--> b" (a if and only if b),
+    and that ensures conditions may refer to "return" and to previous
+    executions with backticks.  This is all handled in a single pass
+    over the condition, skipping string literals.  Each side of an
+    implies is parsed separately and the two are combined into a
+    single expression.  Returns the expression and the maximum number
+    of backticks used.
+    """
+    def _implies(a, b):
+        # "a --> b" is "(not a) or b"
+        return ast.BoolOp(op=ast.Or(), values=[ast.UnaryOp(op=ast.Not(), operand=a), b])
+    def _parse(text):
+        # Parentheses allow the condition to span several lines
+        return ast.parse("(" + text.strip() + "\n)", mode='eval').body
+    btdepth = 0
+    def _rewrite(text, parts, implies):
+        # Rewrite `text` onto the end of `parts`, starting a new part
+        # at each implies if `implies` is a list to record them in.
+        nonlocal btdepth
+        pos = 0
+        for m in _CONDITION_TOKEN.finditer(text):
+            parts[-1] += text[pos:m.start()]
+            pos = m.end()
+            if m.group("implies") and implies is not None:
+                implies.append(m.group("implies"))
+                parts.append("")
+            elif m.group("name"):
+                name = _RET if m.group("name") == "return" else m.group("name")
+                btdepth = max(btdepth, len(m.group("backticks")))
+                parts[-1] += name + _BT*len(m.group("backticks"))
+            elif m.group("string") and "f" in m.group("prefix").lower():
+                parts[-1] += _rewrite_fstring(m.group("string"))
+            else:
+                parts[-1] += m.group(0)
+        parts[-1] += text[pos:]
+    def _rewrite_fstring(literal):
+        # Rewrite the names in the replacement fields of an f-string,
+        # i.e. between single braces.
+        out = ""
+        i = 0
+        while i < len(literal):
+            if literal.startswith("{{", i) or literal.startswith("}}", i):
+                out += literal[i:i+2]
+                i += 2
+            elif literal[i] == "{":
+                depth = 0
+                for j in range(i, len(literal)):
+                    depth += {"{": 1, "}": -1}.get(literal[j], 0)
+                    if depth == 0:
+                        break
+                field = [""]
+                _rewrite(literal[i+1:j], field, None)
+                out += "{" + field[0] + "}"
+                i = j + 1
+            else:
+                out += literal[i]
+                i += 1
+        return out
+    parts = [""]
+    implies = []
+    _rewrite(condition, parts, implies)
+    assert len(implies) <= 1, "Only one implies per statement in %s condition %s" % (condition, func.__qualname__)
+    if implies == ["<-->"]:
+        tree = ast.BoolOp(op=ast.And(), values=[_implies(_parse(parts[0]), _parse(parts[1])),
+                                                _implies(_parse(parts[1]), _parse(parts[0]))])
+    elif implies == ["-->"]:
+        tree = _implies(_parse(parts[0]), _parse(parts[1]))
+    else:
+        tree = _parse(parts[0])
+    return tree, btdepth
+
+def _compile_condition(tree, variables, filename):
+    """Compile a parsed condition into a function of its variables.
+
+    `variables` are the names which will be available when the
+    condition is checked, e.g. the function's arguments.  Only the
+    ones used in `tree` become arguments of the compiled function, and
+    all other names are looked up in the namespace setting.  Returns
+    the code object which creates this function (see _make_condition),
+    and the names of its arguments.
+    `filename` identifies the kind of condition in tracebacks.
+    """
+    names = sorted(set(variables) & {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)})
+    lam = ast.parse("lambda %s : None" % ", ".join(names), mode='eval')
+    lam.body.body = tree
+    return compile(ast.fix_missing_locations(lam), filename, 'eval'), names
+
+class _Globals(dict):
+    """Globals for conditions before Python 3.10.
+
+    Functions could then only find the builtins through their globals.
+    This holds "__builtins__" itself, and looks up all other names in
+    `namespace` when they are used, so changes made to it in place are
+    seen.
+    """
+    def __init__(self, namespace):
+        super().__init__(__builtins__=builtins)
+        self.namespace = namespace
+    def __missing__(self, key):
+        return self.namespace[key]
+
+def _make_condition(code, namespace):
+    """Create the function compiled by _compile_condition.
+
+    The function looks up its globals in the `namespace` dict itself,
+    so that changes made to it in place are seen.  Unlike eval(), this
+    does not add "__builtins__" to the namespace.
+    """
+    lambdacode = next(c for c in code.co_consts if isinstance(c, types.CodeType))
+    if sys.version_info < (3, 10):
+        namespace = _Globals(namespace)
+    return types.FunctionType(lambdacode, namespace)
+
+def _check_accepts(func, argvals, argtypes, testtypes):
+    # @accepts decorator.  `testtypes` is the part of `argtypes` which
+    # needs to be tested, i.e. without the Unchecked arguments.
+    if argtypes is not None:
+        if argtypes.keys() != argvals.keys():
             raise E.ArgumentTypeError("Invalid argument specification in %s" % func.__name__)
-        for k in argtypes.keys():
+        for k in testtypes.keys():
             try:
-                argtypes[k].test(argvals[k])
+                testtypes[k].test(argvals[k])
             except AssertionError as e:
                 raise E.ArgumentTypeError("Invalid argument type: %s=%s is not of type %s in %s" % (k, argvals[k], argtypes[k], func.__qualname__))
 
-def _check_requires(func, argvals):
+def _check_requires(func, argvals, requires, merged):
     # @requires decorator
-    if U.has_fun_prop(func, "requires"):
-        # Function named arguments
-        full_globals = Settings.get("namespace").copy()
-        full_globals.update(argvals)
-        #full_locals = locals().copy()
-        #full_locals.update({k : v for k,v in zip(argspec.args, args)})
-        for requirement,requirementtext,requirementdesc in U.get_fun_prop(func, "requires"):
+    if requires:
+        # If there are several requirements, first check all of them
+        # at once.  Only if this fails do we check them one by one to
+        # find which one failed.
+        if merged is not None:
+            mergedrequirement, mergednames = merged
             try:
-                if not eval(requirement, full_globals, {}):
+                if mergedrequirement(*[argvals[n] for n in mergednames]):
+                    return
+            except Exception:
+                pass
+        # A single try block for all requirements, so that it is only
+        # set up once.  The loop variables tell us which one failed.
+        try:
+            for requirement,names,requirementtext,requirementdesc in requires:
+                if not requirement(*[argvals[n] for n in names]):
                     desctext = requirementdesc+"\n" if requirementdesc is not None else ""
-                    raise E.EntryConditionsError(desctext+"Function requirement '%s' failed in %s\nparams: %s" % (requirementtext,  func.__qualname__, str(argvals)))
-            except Exception as e:
-                if isinstance(e, E.EntryConditionsError):
-                    raise
-                else:
-                    raise E.EntryConditionsError("Invalid function requirement '%s' in %s\nparams: %s" % (requirementtext,  func.__qualname__, str(argvals)))
-
-def _check_returns(func, returnvalue):
+                    raise E.EntryConditionsError("%sFunction requirement '%s' failed in %s\nparams: %s" % (desctext, requirementtext, func.__qualname__, argvals))
+        except E.EntryConditionsError:
+            raise
+        except Exception as e:
+            raise E.EntryConditionsError("Invalid function requirement '%s' in %s\nparams: %s" % (requirementtext, func.__qualname__, argvals))
+
+def _check_returns(func, returnvalue, returntype):
     # @returns decorator
-    if U.has_fun_prop(func, "returntype"):
+    if returntype is not None:
         try:
-            U.get_fun_prop(func, "returntype").test(returnvalue)
+            returntype.test(returnvalue)
         except AssertionError as e:
-            raise E.ReturnTypeError("Invalid return type of %s in %s" % (returnvalue, func.__qualname__) )
+            raise E.ReturnTypeError("Invalid return type of %s in %s" % (returnvalue, func.__qualname__))
 
-def _check_ensures(func, returnvalue, argvals):
+def _check_ensures(func, returnvalue, argvals, ensures, merged, max_cache_size):
     # @ensures decorator
-    if U.has_fun_prop(func, "ensures"):
+    if ensures:
+        props = getattr(func, U._FUN_PROPS)
         # This function call
         current_call = argvals
         current_call[_RET] = returnvalue
-        if U.has_fun_prop(func, "exec_cache"):
-            exec_cache = U.get_fun_prop(func, "exec_cache")
-        else:
-            exec_cache = []
-        for btdepth, ensurement, etext in U.get_fun_prop(func, "ensures"):
+        exec_cache = props.get("exec_cache", [])
+        # All calls which the conditions may refer to, where call 0
+        # is this call.
+        calls_all = [current_call]+exec_cache
+        # If there are several conditions without backticks, first
+        # check all of them at once.  If this succeeds, we don't need
+        # to check them one by one.
+        check_plain = True
+        if merged is not None:
+            mergedensurement, mergednames = merged
+            try:
+                check_plain = not mergedensurement(*[current_call[n] for n in mergednames])
+            except Exception:
+                pass
+        for btdepth, ensurement, lookups, etext in ensures:
+            # Most conditions only refer to this call
+            if btdepth == 0:
+                if not check_plain:
+                    continue
+                if not ensurement(*[current_call[k] for _,k in lookups]):
+                    env_simp = {k.replace(_RET, 'return'): v for k,v in current_call.items()}
+                    raise E.ExitConditionsError("Ensures statement '%s' failed in %s\nparams: %s" % (etext, func.__qualname__, env_simp))
+                continue
             # Here we check the higher order properties, e.g. x,
-            # x`, and x``. There is a lot of repeated and opaque
-            # code here, but I've tried to write it in the
-            # cleanest way possible.
-            for comb in itertools.combinations(exec_cache, btdepth):
-                for params in itertools.permutations([current_call]+list(comb)):
-                    env = dict()
-                    for i in range(0, btdepth+1):
-                        bts = "".join([_BT for j in range(0, i)])
-                        env.update({k+bts : v for k,v in params[i].items()})
-                    limited_globals = Settings.get("namespace").copy()
-                    limited_globals.update(env)
-                    if not eval(ensurement, limited_globals, {}):
-                        env_simp = {k.replace(_BT, '`').replace(_RET, 'return'): v for k,v in env.items()}
-                        raise E.ExitConditionsError("Ensures statement '%s' failed in %s\nparams: %s" % (etext, func.__qualname__, str(env_simp)))
+            # x`, and x``.  Each permutation assigns a call to each
+            # number of backticks, and the condition's arguments are
+            # looked up directly in those calls, so no renamed
+            # copies of the calls are made.
+            for comb in itertools.combinations(range(1, len(calls_all)), btdepth):
+                for calls in itertools.permutations((0,)+comb):
+                    if not ensurement(*[calls_all[calls[i]][k] for i,k in lookups]):
+                        env_simp = {k.replace(_RET, 'return')+'`'*i: v
+                                    for i,c in enumerate(calls)
+                                    for k,v in calls_all[c].items()}
+                        raise E.ExitConditionsError("Ensures statement '%s' failed in %s\nparams: %s" % (etext, func.__qualname__, env_simp))
         # Update the cache
-        if any(btdepth>0 for btdepth,_,_ in U.get_fun_prop(func, "ensures")) : # Cache if we refer to previous executions
+        if props["ensures_has_bt"]: # Cache if we refer to previous executions
             # Keep track of number of executions for reservoir
             # sampling probabilities
             if exec_cache == []:
                 n_execs = 1
-                U.set_fun_prop(func, "exec_cache", exec_cache) # Create exec cache if it doesn't exist
+                props["exec_cache"] = exec_cache # Create exec cache if it doesn't exist
             else:
-                n_execs = U.get_fun_prop(func, "n_execs") + 1
-            U.set_fun_prop(func, "n_execs", n_execs)
-            # Use reservoir sampling to maintain the cache
-            max_cache_size = Settings.get("max_cache", function=func)
+                n_execs = props["n_execs"] + 1
+            props["n_execs"] = n_execs
+            # Use reservoir sampling to maintain the cache.  This is
+            # why the cache is a list and not a deque: a reservoir
+            # replaces entries at random positions, which is O(1) for
+            # a list but O(n) for a deque.
+            if len(exec_cache) > max_cache_size: # max_cache was lowered
+                del exec_cache[max_cache_size:]
             if n_execs <= max_cache_size:
                 exec_cache.append(current_call)
             else:
-                rn = randint(0, n_execs)
+                rn = int(random() * n_execs) # Uniform on 0..n_execs-1
                 if rn < max_cache_size:
                     exec_cache[rn] = current_call
 
 
-def _wrap(func):
-    def _decorated(*args, **kwargs):
-        # Skip verification if paranoid is disabled.
-        if Settings.get("enabled", function=func) == False:
-            return func(*args, **kwargs)
-        # We only run this function once for performance reasons, and
-        # then pass it as an argument to each check function.
-        sig = inspect.Signature.from_callable(func)
+def _make_binder(func):
+    """Build a function which maps a call's arguments to parameter names.
+
+    The returned function takes the positional and keyword arguments
+    of a call as a tuple and a dict, and returns a dict of argument
+    values (including defaults) exactly as Signature.bind_partial
+    followed by apply_defaults would.  The signature is only inspected
+    once.  For the common case of a function with only ordinary
+    parameters, the binding is done with a single pass over the
+    parameter names instead of with inspect.
+    """
+    sig = U.get_signature(func)
+    def _slow_bind(args, kwargs):
         boundargs = sig.bind_partial(*args, **kwargs)
         boundargs.apply_defaults()
-        argvals = dict(boundargs.arguments)
+        return dict(boundargs.arguments)
+    params = sig.parameters.values()
+    if any(p.kind != p.POSITIONAL_OR_KEYWORD for p in params):
+        return _slow_bind
+    names = tuple(sig.parameters.keys())
+    defaults = {p.name : p.default for p in params if p.default is not p.empty}
+    def _bind(args, kwargs):
+        if len(args) > len(names):
+            return _slow_bind(args, kwargs) # Raises the TypeError
+        argvals = dict(zip(names, args))
+        nkwargs = 0
+        for name in names[len(args):]:
+            if name in kwargs:
+                argvals[name] = kwargs[name]
+                nkwargs += 1
+            elif name in defaults:
+                argvals[name] = defaults[name]
+        # Unknown keyword arguments and arguments passed twice are
+        # errors, so let inspect produce the usual TypeError.
+        if nkwargs != len(kwargs):
+            return _slow_bind(args, kwargs)
+        return argvals
+    return _bind
+
+def _specialize(func):
+    """Build a function which runs only the checks `func` currently has.
+
+    The returned function takes the positional and keyword arguments
+    of a call as a tuple and a dict, performs the call, and returns
+    its result.  Which checks are active is decided here, once, rather
+    than on every call.  If paranoid is disabled for `func`, or it has
+    already been checked "max_checked_calls" times, this returns None.
+    """
+    if Settings.get("enabled", function=func) == False:
+        return None
+    props = getattr(func, U._FUN_PROPS)
+    checked = _build_checks(func, props)
+    # Optionally stop checking after a number of successful calls.
+    # We always check when collecting functions to unit test with
+    # "python3 -m paranoid scriptname.py".
+    limit = Settings.get("max_checked_calls", function=func)
+    if limit is None or _ALL_FUNCTIONS is not None:
+        return checked
+    if props.get("n_checked", 0) >= limit:
+        return None
+    def _limited(args, kwargs):
+        returnvalue = checked(args, kwargs)
+        props["n_checked"] = props.get("n_checked", 0) + 1
+        if props["n_checked"] >= limit:
+            props["checked"] = (Settings._version, None)
+        return returnvalue
+    return _limited
+
+def _build_checks(func, props):
+    """The checks for `func` with properties `props`, see _specialize."""
+    # Look up the properties here so the checks don't have to on
+    # each call.
+    argtypes = props.get("argtypes")
+    returntype = props.get("returntype")
+    # Unchecked types never fail, so there is no need to test them.
+    # (Subclasses of Unchecked may define a test, though.)
+    if argtypes is not None:
+        testtypes = {k : t for k,t in argtypes.items()
+                     if type(t) is not T.Unchecked}
+    if type(returntype) is T.Unchecked:
+        returntype = None
+    has_accepts = argtypes is not None
+    has_requires = "requires" in props
+    has_returns = returntype is not None
+    has_ensures = "ensures" in props
+    # If no check needs the arguments, we don't need to bind them.
+    # This is the common case for a function with only @returns.
+    if not (has_accepts or has_requires or has_ensures):
+        if not has_returns:
+            return lambda args, kwargs : func(*args, **kwargs)
+        def _checked(args, kwargs):
+            returnvalue = func(*args, **kwargs)
+            _check_returns(func, returnvalue, returntype)
+            return returnvalue
+        return _checked
+    bind = _make_binder(func)
+    # Create the functions for the entry and exit conditions.  They
+    # use the namespace dict as their globals.  It may be modified in
+    # place, but if it is replaced, the settings version changes and
+    # we are rebuilt.
+    namespace = Settings.get("namespace")
+    if has_requires:
+        requires = [(_make_condition(code, namespace), names, text, desc)
+                    for code,names,text,desc in props["requires"]]
+        requires_merged = None
+        if len(requires) > 1:
+            code, names, _ = props["requires_merged"]
+            requires_merged = (_make_condition(code, namespace), names)
+    if has_ensures:
+        ensures = [(btdepth, _make_condition(code, namespace), lookups, text)
+                   for btdepth,code,lookups,text in props["ensures"]]
+        ensures_merged = None
+        if len(props["ensures_merged"][2]) > 1:
+            code, names, _ = props["ensures_merged"]
+            ensures_merged = (_make_condition(code, namespace), names)
+        max_cache_size = Settings.get("max_cache", function=func)
+    def _checked(args, kwargs):
+        # We only bind the arguments once for performance reasons, and
+        # then pass them as an argument to each check function.
+        argvals = bind(args, kwargs)
 
         # Check entry conditions, run the function, check exit
         # conditions, and return the result of the function.
-        _check_accepts(func, argvals)
-        _check_requires(func, argvals)
+        if has_accepts:
+            _check_accepts(func, argvals, argtypes, testtypes)
+        if has_requires:
+            _check_requires(func, argvals, requires, requires_merged)
         returnvalue = func(*args, **kwargs)
-        _check_returns(func, returnvalue)
-        _check_ensures(func, returnvalue, argvals)
+        if has_returns:
+            _check_returns(func, returnvalue, returntype)
+        if has_ensures:
+            _check_ensures(func, returnvalue, argvals, ensures, ensures_merged, max_cache_size)
         return returnvalue
-    
+    return _checked
+
+def _wrap(func):
+    def _decorated(*args, **kwargs):
+        # The checks are specialized on first use, and again whenever
+        # a decorator adds a new check (see below) or a setting is
+        # changed.
+        version, checked = props["checked"]
+        if version != Settings._version:
+            checked = _specialize(func)
+            props["checked"] = (Settings._version, checked)
+        # Skip verification if paranoid is disabled.
+        if checked is None:
+            return func(*args, **kwargs)
+        return checked(args, kwargs)
+
     if U.has_fun_prop(func, "active"):
+        # A decorator was stacked on an already-wrapped function, so
+        # the set of checks may have changed.
+        U.set_fun_prop(func, "checked", (None, None))
+        return func
+    # If paranoid is disabled when the function is defined, don't wrap
+    # it at all, so that it runs with no overhead.  The exception is
+    # when we are collecting functions to unit test with "python3 -m
+    # paranoid scriptname.py".
+    elif Settings.get("enabled", function=func) == False and \
+         _ALL_FUNCTIONS is None:
         return func
     else:
         U.set_fun_prop(func, "active", True)
-        assign = functools.WRAPPER_ASSIGNMENTS + \
-                 (U._FUN_PROPS, Settings.FUNCTION_SETTINGS_NAME)
-        wrapped = functools.wraps(func, assigned=assign)(_decorated)
+        U.set_fun_prop(func, "checked", (None, None))
+        props = getattr(func, U._FUN_PROPS)
+        wrapped = functools.update_wrapper(_decorated, func, assigned=_WRAPPER_ASSIGN)
+        U.set_fun_prop(func, "wrapper", wrapped)
         # A list of all functions for when Paranoid Scientist is
-        # invoked with "python3 -m paranoid scriptname.py".  If the
-        # name "__ALL_FUNCTIONS" is not defined, then we assume
-        # paranoid was not called in this way.  If it is defined, we
-        # add this function to the list.
-        if "__ALL_FUNCTIONS" in globals().keys():
-            __ALL_FUNCTIONS.append(wrapped)
+        # invoked with "python3 -m paranoid scriptname.py".  If
+        # _ALL_FUNCTIONS is None, then we assume paranoid was not
+        # called in this way.  Otherwise, we add this function to the
+        # list.
+        if _ALL_FUNCTIONS is not None:
+            _ALL_FUNCTIONS.append(wrapped)
         return wrapped
 
 def accepts(*argtypes, **kwargtypes):
@@ -164,7 +464,7 @@ def accepts(*argtypes, **kwargtypes):
     def _decorator(func):
         # @accepts decorator
         f = func.__wrapped__ if hasattr(func, "__wrapped__") else func
-        sig = inspect.signature(f)
+        sig = U.get_signature(func)
         boundargs = sig.bind(*theseargtypes, **thesekwargtypes)
         argtypes = {}
         # Loop through each of the parameters in the function's call
@@ -214,7 +514,10 @@ def returns(returntype):
         return _wrap(func)
     return _decorator
 
-# Adds the "requires" property: list of (compiledcondition, conditiontext)
+# Adds the "requires" property: list of (compiledcondition,
+# conditionvariables, conditiontext, conditiondescription), and the
+# "requires_merged" property: (compiledcondition, conditionvariables,
+# conditiontrees) for all requirements together
 def requires(condition, description=None):
     """A function decorator to specify entry conditions for the function.
 
@@ -250,27 +553,31 @@ def requires(condition, description=None):
     """
     def _decorator(func, condition=condition, description=description):
         # @requires decorator
-        if U.has_fun_prop(func, "requires"):
-            if not isinstance(U.get_fun_prop(func, "requires"), list):
-                raise E.InternalError("Invalid requires structure")
-            base_requires = U.get_fun_prop(func, "requires")
+        base_requires = U.get_fun_prop(func, "requires", [])
+        if not isinstance(base_requires, list):
+            raise E.InternalError("Invalid requires structure")
+        variables = U.get_signature(func).parameters.keys()
+        tree, btdepth = _parse_condition(condition, func)
+        assert btdepth == 0, "Backticks are only allowed in ensures, not in %s condition %s" % (condition, func.__qualname__)
+        code, names = _compile_condition(tree, variables, "<paranoid-requires>")
+        U.set_fun_prop(func, "requires", [(code, names, condition, description)]+base_requires)
+        # All requirements combined with "and", in the same order
+        base_merged = U.get_fun_prop(func, "requires_merged", None)
+        if base_merged is not None:
+            trees = [tree] + base_merged[2]
+            mergedtree = ast.BoolOp(op=ast.And(), values=trees)
+            code, names = _compile_condition(mergedtree, variables, "<paranoid-requires>")
         else:
-            base_requires = []
-        base_condition = condition
-        if "<-->" in condition:
-            condition_parts = condition.split("<-->")
-            assert len(condition_parts) == 2, "Only one implies per statement in %s condition %s" % (condition, func.__qualname__)
-            condition = "((%s) if (%s) else True) and ((%s) if (%s) else True)" % (condition_parts[1], condition_parts[0], condition_parts[0], condition_parts[1])
-        elif "-->" in condition:
-            condition_parts = condition.split("-->")
-            assert len(condition_parts) == 2, "Only one implies per statement in %s condition %s" % (base_condition, func.__qualname__)
-            condition = "(%s) if (%s) else True" % (condition_parts[1], condition_parts[0])
-
-        U.set_fun_prop(func, "requires", [(compile(condition, '', 'eval'), condition, description)]+base_requires)
+            trees = [tree]
+        U.set_fun_prop(func, "requires_merged", (code, names, trees))
         return _wrap(func)
     return _decorator
 
-# Adds the "requires" property: list of (backtickdepth, compiledcondition, conditiontext)
+# Adds the "ensures" property: list of (backtickdepth,
+# compiledcondition, conditionvariables, conditiontext), where
+# conditionvariables are (backticks, variablename) pairs, and the
+# "ensures_merged" property: (compiledcondition, conditionvariables,
+# conditiontrees) for all conditions without backticks together
 def ensures(condition):
     """A function decorator to specify exit conditions for the function.
 
@@ -303,30 +610,42 @@ def ensures(condition):
     """
     def _decorator(func, condition=condition):
     # @ensures decorator
-        if U.has_fun_prop(func, "ensures"):
-            if not isinstance(U.get_fun_prop(func, "ensures"), list):
-                raise E.InternalError("Invalid ensures strucutre")
-            ensures_statements = U.get_fun_prop(func, "ensures")
-        else:
-            ensures_statements = []
-        e = condition.replace("return", _RET)
-        if "<-->" in e:
-            e_parts = e.split("<-->")
-            assert len(e_parts) == 2, "Only one implies per statement in %s condition %s" % (ensurement, func.__qualname__)
-            e = "((%s) if (%s) else True) and ((%s) if (%s) else True)" % (e_parts[1], e_parts[0], e_parts[0], e_parts[1])
-            assert "-->" not in e, "Only one implies per statement in %s condition %s"  % (ensurement, func.__qualname__)
-        if "-->" in e:
-            e_parts = e.split("-->")
-            assert len(e_parts) == 2, "Only one implies per statement in %s condition %s" % (ensurement, func.__qualname__)
-            e = "(%s) if (%s) else True" % (e_parts[1], e_parts[0])
+        ensures_statements = U.get_fun_prop(func, "ensures", [])
+        if not isinstance(ensures_statements, list):
+            raise E.InternalError("Invalid ensures strucutre")
         # btdepth is the maximum number of consecutive ` characters
         # that appears in the ensures statement, and represents power
         # of the number of comparisons we must perform on cached
         # values.
-        btdepth = max([0]+[sum(1 for x in g) for c,g in itertools.groupby(e) if c == "`"])
-        e = e.replace("`", _BT)
-        compiled = compile(e, '', 'eval')
-        U.set_fun_prop(func, "ensures", [(btdepth, compiled, condition)]+ensures_statements)
+        tree, btdepth = _parse_condition(condition, func)
+        # The variables are the arguments and the return value, with
+        # up to btdepth backticks.
+        argnames = list(U.get_signature(func).parameters.keys()) + [_RET]
+        variables = [k+_BT*i for k in argnames for i in range(0, btdepth+1)]
+        compiled, names = _compile_condition(tree, variables, "<paranoid-ensures>")
+        # For each argument of the compiled condition, the number of
+        # backticks and the name of the variable in its call.
+        lookups = []
+        for n in names:
+            depth = 0
+            while n.endswith(_BT):
+                n = n[:-len(_BT)]
+                depth += 1
+            lookups.append((depth, n))
+        ensures_statements = [(btdepth, compiled, lookups, condition)]+ensures_statements
+        U.set_fun_prop(func, "ensures", ensures_statements)
+        # Whether any condition refers to previous executions
+        U.set_fun_prop(func, "ensures_has_bt", any(bt>0 for bt,_,_,_ in ensures_statements))
+        # All conditions without backticks combined with "and", in the
+        # same order
+        trees = U.get_fun_prop(func, "ensures_merged", (None, None, []))[2]
+        if btdepth == 0:
+            trees = [tree] + trees
+        if len(trees) > 1:
+            code, names = _compile_condition(ast.BoolOp(op=ast.And(), values=trees), argnames, "<paranoid-ensures>")
+        else:
+            code, names = None, None
+        U.set_fun_prop(func, "ensures_merged", (code, names, trees))
         return _wrap(func)
     return _decorator
 
@@ -344,10 +663,22 @@ def paranoidclass(cls):
       |     def distance_from_zero():
       |         ...
     """
-    for methname in dir(cls):
-        meth = getattr(cls, methname)
-        if U.has_fun_prop(meth, "argtypes"):
-            argtypes = U.get_fun_prop(meth, "argtypes")
+    # Look at the methods defined in this class and the ones it
+    # inherits, as getattr would find them, but without evaluating
+    # descriptors or visiting the attributes of object.  Inherited
+    # methods whose class used @paranoidclass have no Self types left.
+    methods = {}
+    for klass in reversed(cls.__mro__):
+        if klass is not object:
+            methods.update(vars(klass))
+    for methname, meth in methods.items():
+        # Static and class methods keep the function in __func__
+        if isinstance(meth, (staticmethod, classmethod)):
+            meth = meth.__func__
+        if not callable(meth):
+            continue
+        argtypes = U.get_fun_prop(meth, "argtypes", None)
+        if argtypes is not None:
             for argname in argtypes.keys():
                 if isinstance(argtypes[argname], T.Self):
                     # "self" means something different in the __init__
@@ -361,9 +692,12 @@ def paranoidclass(cls):
                     for i in range(0, len(argtypes[argname].types)):
                         if isinstance(argtypes[argname].types[i], T.Self):
                             argtypes[argname].types[i] = T.Generic(cls)
-        if U.has_fun_prop(meth, "returntype"):
-            if isinstance(U.get_fun_prop(meth, "returntype"), T.Self):
-                U.set_fun_prop(meth, "returntype", T.Generic(cls))
+        if isinstance(U.get_fun_prop(meth, "returntype", None), T.Self):
+            U.set_fun_prop(meth, "returntype", T.Generic(cls))
+        # The types may have changed, so rebuild the checks in case
+        # the method was already called.
+        if U.has_fun_prop(meth, "checked"):
+            U.set_fun_prop(meth, "checked", (None, None))
     return cls
 
 def paranoidconfig(**kwargs):
@@ -385,5 +719,11 @@ def paranoidconfig(**kwargs):
     def _decorator(func):
         for k,v in kwargs.items():
             Settings._set(k, v, function=func)
+        # If we are disabling a function which was already wrapped,
+        # remove the wrapper so that it runs with no overhead, as if
+        # it had been disabled before it was wrapped.
+        if kwargs.get("enabled") is False and _ALL_FUNCTIONS is None and \
+           U.get_fun_prop(func, "wrapper", None) is func:
+            return func.__wrapped__
         return _wrap(func)
     return _decorator
@@ -4,9 +4,11 @@
 # MIT license.  Please see LICENSE.txt in the root directory for more
 # information.
 
+import warnings
 from .settings import Settings
 
-print("Warning, paranoid.ignore is depreciated.  " \
-      "Use settings.Settings.set(enabled=False) instead.")
+warnings.warn("paranoid.ignore is deprecated.  "
+              "Use settings.Settings.set(enabled=False) instead.",
+              DeprecationWarning, stacklevel=2)
 
 Settings.set(enabled=False)
@@ -28,6 +28,10 @@ class Settings:
     """
 
     FUNCTION_SETTINGS_NAME = "__function_settings__"
+    # Incremented every time a setting is changed, globally or
+    # locally.  Decorated functions compare against this to know when
+    # they must re-read their settings.
+    _version = 0
     # Default values for settings.  Each variable which can be set
     # either locally or globally must be listed here with a default
     # value.
@@ -41,6 +45,7 @@ class Settings:
         'unit_test' : True,
         'max_runtime': 2,
         'max_cache' : 2,
+        'max_checked_calls' : None,
         'namespace' : {}}
     # Validity functions.  Each variable listed above has an
     # associated validation function.  While not strictly required,
@@ -50,6 +55,7 @@ class Settings:
         'unit_test' : lambda x : x in [True, False],
         'max_runtime' : lambda x : type(x) in [int, float] and x >= 0,
         'max_cache' : lambda x : isinstance(x, int) and x >= 0,
+        'max_checked_calls' : lambda x : x is None or (isinstance(x, int) and x >= 0),
         'namespace' : lambda x : isinstance(x, dict) and all(isinstance(k, str) for k in x.keys())}
     def __init__(self):
         """Do not try to instantiate this."""
@@ -82,17 +88,20 @@ class Settings:
         module.
         """
 
-        if name not in Settings.__global_setting_values.keys():
+        if name not in Settings.__global_setting_values:
             raise NameError("Invalid setting value")
-        if name in Settings.__validate_settings.keys():
-            if not Settings.__validate_settings[name](value):
-                raise ValueError("Invalid setting: %s = %s" %
-                                 (name, value))
+        validate = Settings.__validate_settings.get(name)
+        if validate is not None and not validate(value):
+            raise ValueError("Invalid setting: %s = %s" %
+                             (name, value))
+        Settings._version += 1
         # Set the setting either globally (if no function is passed)
         # or else locally to the function (if a function is passed).
         if function:
-            if not hasattr(function, Settings.FUNCTION_SETTINGS_NAME):
-                setattr(function, Settings.FUNCTION_SETTINGS_NAME, {})
+            function_settings = getattr(function, Settings.FUNCTION_SETTINGS_NAME, None)
+            if function_settings is None:
+                function_settings = {}
+                setattr(function, Settings.FUNCTION_SETTINGS_NAME, function_settings)
                 # Test if this wraps something.  TODO this will fail
                 # for nested decorators.  This also assumes that, if
                 # there is a wrapped function (super wraps sub), that
@@ -103,8 +112,8 @@ class Settings:
                 if hasattr(function, "__wrapped__"):
                     setattr(function.__wrapped__,
                             Settings.FUNCTION_SETTINGS_NAME,
-                            getattr(function, Settings.FUNCTION_SETTINGS_NAME))
-            getattr(function, Settings.FUNCTION_SETTINGS_NAME)[name] = value
+                            function_settings)
+            function_settings[name] = value
         else:
             Settings.__global_setting_values[name] = value
     def get(name, function=None):
@@ -116,7 +125,7 @@ class Settings:
         value.
         """
         if function is not None:
-            if hasattr(function, Settings.FUNCTION_SETTINGS_NAME):
-                if name in getattr(function, Settings.FUNCTION_SETTINGS_NAME):
-                    return getattr(function, Settings.FUNCTION_SETTINGS_NAME)[name]
+            function_settings = getattr(function, Settings.FUNCTION_SETTINGS_NAME, None)
+            if function_settings is not None and name in function_settings:
+                return function_settings[name]
         return Settings.__global_setting_values[name]
@@ -14,6 +14,30 @@ from . import utils
 from .exceptions import NoGeneratorError, EntryConditionsError, TestCaseTimeoutError
 from .settings import Settings
 
+def _timeout(s=None, f=None):
+    """Signal handler for SIGALRM used by max_run_time."""
+    raise TestCaseTimeoutError
+
+_HAS_ALARM = "alarm" in signal.__dict__ and "SIGALRM" in signal.__dict__
+
+@contextmanager
+def _timeout_handler():
+    """Install the SIGALRM handler used by max_run_time.
+
+    max_run_time installs the handler itself if it needs to, but when
+    timing many code segments in a row, it is cheaper to install it
+    once around all of them.  The previous handler is restored
+    afterwards.
+    """
+    if not _HAS_ALARM or signal.getsignal(signal.SIGALRM) is _timeout:
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _timeout)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
 @contextmanager
 def max_run_time(t):
     """Limit the runtime of a code segment.
@@ -27,15 +51,13 @@ def max_run_time(t):
         with max_run_time(5):
             potentially_long_function()
     """
-    def callback(s=None, f=None):
-        raise TestCaseTimeoutError
-    if "alarm" in signal.__dict__ and "SIGALRM" in signal.__dict__:
-        signal.signal(signal.SIGALRM, callback)
-        signal.setitimer(signal.ITIMER_REAL, t)
-        try:
-            yield
-        finally:
-            signal.setitimer(signal.ITIMER_REAL, 0) # Cancel alarm
+    if _HAS_ALARM:
+        with _timeout_handler():
+            signal.setitimer(signal.ITIMER_REAL, t)
+            try:
+                yield
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0) # Cancel alarm
     else:
         yield
 
@@ -62,12 +84,15 @@ def test_function(func):
     # argument types cannot be generated automatically.  If we
     # encounter one of these, unit testing won't work.
     args = utils.get_fun_prop(func, "argtypes")
+    argnames = sorted(args.keys())
 
+    # generate() may also return nothing at all, e.g. for Not, so an
+    # argument type with no values makes the function untestable too.
     try:
-        testcases = itertools.product(*[list(args[k].generate()) for k in sorted(args.keys())])
+        generated = [tuple(args[k].generate() or ()) for k in argnames]
     except NoGeneratorError:
-        testcases = []
-    if not testcases:
+        generated = [()]
+    if any(len(g) == 0 for g in generated):
         print("Warning: %s could not be tested" % func.__name__)
         return 0
     # If we have disabled unit testing for this function, don't run
@@ -78,16 +103,19 @@ def test_function(func):
     # enough of a test, since all values are checked at runtime.  So
     # execute the function once for each combination of arguments.
     totaltests = 0
-    for tc in testcases:
-        kwargs_name = utils.get_func_kwargs_name(func)
-        try:
-            kws = tc[sorted(args.keys()).index(kwargs_name)] if kwargs_name else {}
-            with max_run_time(Settings.get("max_runtime", function=func)):
-                func(**{k : v for k,v in zip(sorted(args.keys()),tc) if k != kwargs_name},
-                     **kws)
-                totaltests += 1
-        except EntryConditionsError:
-            continue
-        except TestCaseTimeoutError:
-            print("Funciton timeout, continuing")
+    kwargs_name = utils.get_func_kwargs_name(func)
+    kwargs_index = argnames.index(kwargs_name) if kwargs_name else None
+    runtime = Settings.get("max_runtime", function=func)
+    with _timeout_handler():
+        for tc in itertools.product(*generated):
+            try:
+                kws = tc[kwargs_index] if kwargs_name else {}
+                with max_run_time(runtime):
+                    func(**{k : v for k,v in zip(argnames,tc) if k != kwargs_name},
+                         **kws)
+                    totaltests += 1
+            except EntryConditionsError:
+                continue
+            except TestCaseTimeoutError:
+                print("Funciton timeout, continuing")
     return totaltests
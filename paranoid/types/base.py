@@ -10,6 +10,7 @@ __all__ = ['TypeFactory', 'Type', 'Constant', 'Unchecked', 'Generic',
 
 from ..exceptions import VerifyError, NoGeneratorError, InvalidTypeError
 import inspect
+import weakref
 
 def TypeFactory(v):
     """Ensure `v` is a valid Type.
@@ -23,17 +24,40 @@ def TypeFactory(v):
     """
 
     if v is None:
-        return Nothing()
+        return _shared_instance(Nothing, Nothing)
     elif issubclass(type(v), Type):
         return v
     elif isinstance(v, type) and issubclass(v, Type):
-        return v()
+        return _shared_instance(v, v)
     elif issubclass(type(v), type):
-        return Generic(v)
+        return _shared_instance(v, lambda : Generic(v))
     else:
         raise InvalidTypeError("Invalid type %s" % v)
 
+# Types created from classes take no arguments, so one instance can
+# be shared by all functions which use them, e.g. @accepts(Number) or
+# @returns(None).  An instance is only kept while something uses it,
+# and classes which can't be hashed get a new instance each time.
+_shared_instances = weakref.WeakValueDictionary()
+
+def _shared_instance(v, make):
+    try:
+        inst = _shared_instances.get(v)
+    except TypeError:
+        return make()
+    if inst is None:
+        inst = _shared_instances[v] = make()
+    return inst
+
 class _MetaType(type):
+    def __init__(cls, name, bases, attrs):
+        super().__init__(name, bases, attrs)
+        # A class's _contains_fast only agrees with its own test(), so
+        # don't use it in subclasses which override test().
+        def owner(attr):
+            return next((c for c in cls.__mro__ if attr in vars(c)), None)
+        cls._use_contains_fast = owner("_contains_fast") is not None and \
+                                 owner("_contains_fast") is owner("test")
     def __repr__(cls):
         return cls.__name__
 
@@ -49,15 +73,19 @@ class Type(metaclass=_MetaType):
     "test" and "generate" functions.
     """
     def __init__(self, *args, **kwargs):
-        # Create the string representation
-        pargs = [repr(v) for v in args]
-        kargs = [k+"="+repr(v) for k,v in kwargs.items()]
-        allargs = pargs+kargs
-        self._repr = self.__class__.__name__
-        if allargs:
-            self._repr += "(%s)" % (", ".join(pargs+kargs))
+        # Save the arguments for the string representation, which is
+        # only created when it is needed.
+        self._repr_args = (args, kwargs)
         super().__init__()
     def __repr__(self):
+        if not hasattr(self, "_repr"):
+            args, kwargs = self._repr_args
+            pargs = [repr(v) for v in args]
+            kargs = [k+"="+repr(v) for k,v in kwargs.items()]
+            allargs = pargs+kargs
+            self._repr = self.__class__.__name__
+            if allargs:
+                self._repr += "(%s)" % (", ".join(allargs))
         return self._repr
     def test(self, v):
         """Check whether `v` is a valid value of this type.  Throws an
@@ -68,6 +96,10 @@ class Type(metaclass=_MetaType):
         """Generate a list of values of this type."""
         raise NotImplementedError("Please subclass Type")
     def __contains__(self, v):
+        # Types may define _contains_fast(v), which returns whether
+        # test(v) would pass without raising an AssertionError.
+        if self._use_contains_fast:
+            return self._contains_fast(v)
         try:
             self.test(v)
         except AssertionError:
@@ -84,8 +116,9 @@ class Constant(Type):
     def __repr__(self):
         return "Constant(%s)" % repr(self.const)
     def test(self, v):
-        super().test(v)
         assert self.const == v, "Invalid constant"
+    def _contains_fast(self, v):
+        return self.const == v
     def generate(self):
         yield self.const
 
@@ -98,6 +131,8 @@ class Unchecked(Type):
         else:
             self.typ = None
             super().__init__()
+    def _contains_fast(self, v):
+        return True
     def generate(self):
         if self.typ is not None:
             yield from self.typ.generate()
@@ -116,12 +151,17 @@ class Generic(Type):
         assert isinstance(typ, type)
         assert not isinstance(typ, Type), "Types don't need to be wrapped"
         self.type = typ
+        # Find the _test functions of the class and its parents once,
+        # rather than walking the class hierarchy on every test.  Only
+        # look at classes which define _test themselves, so that an
+        # inherited _test is not run once for each subclass.
+        type_and_parents = reversed(typ.__mro__[:-1]) # -1 removes <class 'object'>
+        self._tests = [t._test for t in type_and_parents
+                       if "_test" in vars(t) and callable(t._test)]
     def test(self, v):
         assert isinstance(v, self.type)
-        type_and_parents = reversed(self.type.mro()[:-1]) # -1 removes <class 'object'>
-        for t in type_and_parents:
-            if hasattr(t, "_test") and callable(t._test):
-                t._test(v)
+        for _test in self._tests:
+            _test(v)
     def __repr__(self):
         return "Generic(%s)" % self.type
     def generate(self):
@@ -174,6 +214,8 @@ class Nothing(Type):
     """The None type."""
     def test(self, v):
         assert v is None
+    def _contains_fast(self, v):
+        return v is None
     def generate(self):
         yield None
 
@@ -181,6 +223,8 @@ class Void(Type):
     """Always fails."""
     def test(self, v):
         assert False
+    def _contains_fast(self, v):
+        return False
     def generate(self):
         raise NoGeneratorError
 
@@ -188,7 +232,6 @@ class Void(Type):
 class Function(Type):
     """Any function."""
     def test(self, v):
-        super().test(v)
         assert callable(v), "Not a function"
     def generate(self):
         raise NoGeneratorError
@@ -196,8 +239,9 @@ class Function(Type):
 class Boolean(Type):
     """True or False"""
     def test(self, v):
-        super().test(v)
         assert v in [True, False], "Not a boolean"
+    def _contains_fast(self, v):
+        return v in [True, False]
     def generate(self):
         yield True
         yield False
@@ -216,15 +260,20 @@ class And(Type):
         for t in self.types:
             t.test(v)
     def generate(self):
-        all_generated = [e for t in self.types for e in t.generate() or []]
-        valid_generated = []
-        for g in all_generated:
+        # Several of the types may generate the same value, which
+        # would otherwise be tested more than once.  Unhashable values
+        # are not de-duplicated.
+        seen = set()
+        # Some types, e.g. Not, return None instead of generating values
+        for g in (e for t in self.types for e in t.generate() or []):
             try:
-                for t in self.types:
-                    t.test(g)
-            except AssertionError:
-                continue
-            else:
+                key = (type(g), g)
+                if key in seen:
+                    continue
+                seen.add(key)
+            except TypeError:
+                pass
+            if all(g in t for t in self.types):
                 yield g
 
 class Or(Type):
@@ -238,9 +287,10 @@ class Or(Type):
         self.types = [TypeFactory(a) for a in types]
         super().__init__(*self.types)
     def test(self, v):
-        passed = False
-        if not any(v in t for t in self.types):
-            raise AssertionError("Neither type in Or holds")
+        for t in self.types:
+            if v in t:
+                return
+        raise AssertionError("Neither type in Or holds")
     def generate(self):
         ng = (e for t in self.types for e in t.generate())
         for g in ng:
@@ -282,7 +332,6 @@ class PositionalArguments(Type):
     This is used internally.
     """
     def test(self, v):
-        super().test(v)
         assert isinstance(v, tuple), "Non-dict passed"
     def generate(self):
         yield ()
@@ -294,7 +343,6 @@ class KeywordArguments(Type):
     This is used internally.
     """
     def test(self, v):
-        super().test(v)
         assert isinstance(v, dict), "Non-dict passed"
         for e in v.keys():
             isinstance(e, str)
@@ -20,7 +20,6 @@ class Set(Type):
         assert hasattr(els, "__contains__") and callable(els.__contains__)
         self.els = els
     def test(self, v):
-        super().test(v)
         assert v in self.els, "Value %s in set" % v
     def generate(self):
         for e in self.els:
@@ -32,7 +31,6 @@ class List(Type):
         super().__init__(t)
         self.type = TypeFactory(t)
     def test(self, v):
-        super().test(v)
         assert isinstance(v, list), "Non-list passed"
         for e in v:
             self.type.test(e)
@@ -47,7 +45,6 @@ class Tuple(Type):
         self.types = [TypeFactory(t) for t in args]
         super().__init__(*self.types)
     def test(self, v):
-        super().test(v)
         assert isinstance(v, tuple), "Non-tuple passed"
         assert len(v) == len(self.types)
         for i in range(0, len(v)):
@@ -62,7 +59,6 @@ class Dict(Type):
         self.keytype = TypeFactory(k)
         super().__init__(k=self.keytype, v=self.valtype)
     def test(self, v):
-        super().test(v)
         assert isinstance(v, dict), "Non-dict passed"
         for e in v.keys():
             self.keytype.test(e)
@@ -94,7 +90,6 @@ class ParametersDict(Type):
         self.all_mandatory = all_mandatory
         super().__init__(self.params, all_mandatory=all_mandatory)
     def test(self, v):
-        super().test(v)
         assert isinstance(v, dict), "Non-dict passed"
         assert not set(v.keys()) - set(self.params.keys()), \
             "Invalid reward keys"
@@ -16,11 +16,15 @@ except ImportError:
     print("Warning: numpy not found.  Numpy support disabled.")
     NUMERIC_TYPES = (int, float)
     USE_NUMPY = False
+# Type tests below check type(v) against int and float before calling
+# isinstance, since isinstance must try each of NUMERIC_TYPES in turn
+# and most values are plain Python numbers.
 
 class Numeric(Type):
     """Any integer or float, including inf, -inf, and nan."""
     def test(self, v):
-        assert isinstance(v, NUMERIC_TYPES), "Invalid numeric"
+        assert type(v) is float or type(v) is int or \
+            isinstance(v, NUMERIC_TYPES), "Invalid numeric"
     def test_numpy(self, v):
         assert isinstance(v.dtype.type(), np.floating) or \
             isinstance(v.dtype.type(), np.integer), "Invalid datatype"
@@ -39,7 +43,8 @@ class Numeric(Type):
 class ExtendedReal(Type):
     """Any integer or float, excluding nan."""
     def test(self, v):
-        assert isinstance(v, NUMERIC_TYPES), "Invalid numeric"
+        assert type(v) is float or type(v) is int or \
+            isinstance(v, NUMERIC_TYPES), "Invalid numeric"
         assert not math.isnan(v), "Number cannot be nan"
     def test_numpy(self, v):
         assert isinstance(v.dtype.type(), np.floating) or \
@@ -59,7 +64,8 @@ class ExtendedReal(Type):
 class Number(Type):
     """Any integer or float, excluding inf, -inf, and nan."""
     def test(self, v):
-        assert isinstance(v, NUMERIC_TYPES), "Invalid number"
+        assert type(v) is float or type(v) is int or \
+            isinstance(v, NUMERIC_TYPES), "Invalid number"
         assert math.isfinite(v), "Number must not be nan or inf"
     def test_numpy(self, v):
         assert isinstance(v.dtype.type(), np.floating) or \
@@ -76,13 +82,21 @@ class Number(Type):
 class Integer(Type):
     """Any integer."""
     def test(self, v):
-        assert isinstance(v, NUMERIC_TYPES), "Invalid number"
+        # Python ints are always finite and whole.  (They may also be
+        # too large to convert to a float for math.isinf.)
+        if type(v) is int:
+            return
+        assert type(v) is float or \
+            isinstance(v, NUMERIC_TYPES), "Invalid number"
         assert not math.isinf(v), "Number must be finite"
         assert not math.isnan(v), "Number cannot be nan"
         assert v // 1 == v, "Invalid integer"
     def test_numpy(self, v):
         assert isinstance(v.dtype.type(), np.floating) or \
             isinstance(v.dtype.type(), np.integer), "Invalid datatype"
+        # Likewise for arrays with an integer datatype
+        if np.issubdtype(v.dtype, np.integer):
+            return
         assert np.all(np.isfinite(v)), "Number cannot be nan or inf"
         assert np.all(v // 1 == v), "Invalid integer"
     def generate(self):
@@ -251,7 +265,7 @@ class NDArray(Type):
                 self.testfunc = self.type.test_numpy
             else:
                 def testfunc(x):
-                    for xv in x.flatten():
+                    for xv in x.flat:
                         assert xv in self.type, \
                             "Array value %s is not of type %s" % (xv, repr(self.type))
                 self.testfunc = testfunc
@@ -260,7 +274,6 @@ class NDArray(Type):
             self.testfunc = lambda x : True
         self.d = d
     def test(self, v):
-        super().test(v)
         assert isinstance(v, np.ndarray), "V is not an NDArray, it is a " + str(type(v))
         if self.d is not None:
             assert len(v.shape) == self.d
@@ -8,6 +8,7 @@ from .exceptions import InternalError
 import inspect
 
 _FUN_PROPS = "__verify__" # Name of dict used internally to store function properties
+_MISSING = object() # Default for get_fun_prop when no default is given
 
 def has_fun_prop(f, k):
     """Test whether function `f` has property `k`.
@@ -28,20 +29,23 @@ def has_fun_prop(f, k):
         return False
     return True
 
-def get_fun_prop(f, k):
+def get_fun_prop(f, k, default=_MISSING):
     """Get the value of property `k` from function `f`.
 
     We define properties as annotations added to a function throughout
     the process of defining a function for verification, e.g. the
     argument types.  If `f` does not have a property named `k`, this
-    throws an error.  If `f` has the property named `k`, it returns
-    the value of it.
+    returns `default` if it is given, and otherwise throws an error.
+    If `f` has the property named `k`, it returns the value of it.
 
     Users should never access this function directly.
     """
-    if not has_fun_prop(f, k):
-        raise InternalError("Function %s has no property %s" % (str(f), k))
-    return getattr(f, _FUN_PROPS)[k]
+    props = getattr(f, _FUN_PROPS, None)
+    if isinstance(props, dict) and k in props:
+        return props[k]
+    if default is not _MISSING:
+        return default
+    raise InternalError("Function %s has no property %s" % (str(f), k))
 
 def set_fun_prop(f, k, v):
     """Set the value of property `k` to be `v` in function `f`.
@@ -59,9 +63,25 @@ def set_fun_prop(f, k, v):
         raise InternalError("Invalid properties dictionary for %s" % str(f))
     getattr(f, _FUN_PROPS)[k] = v
 
+def get_signature(f):
+    """Get the call signature of function `f`.
+
+    The signature is stored as a property of `f` if it has properties,
+    so that decorating a function several times only inspects it once.
+
+    Users should never access this function directly.
+    """
+    sig = get_fun_prop(f, "signature", None)
+    if sig is not None:
+        return sig
+    sig = inspect.signature(f)
+    if hasattr(f, _FUN_PROPS):
+        set_fun_prop(f, "signature", sig)
+    return sig
+
 def get_func_posargs_name(f):
     """Returns the name of the function f's keyword argument parameter if it exists, otherwise None"""
-    sigparams = inspect.signature(f).parameters
+    sigparams = get_signature(f).parameters
     for p in sigparams:
         if sigparams[p].kind == inspect.Parameter.VAR_POSITIONAL:
             return sigparams[p].name
@@ -69,7 +89,7 @@ def get_func_posargs_name(f):
 
 def get_func_kwargs_name(f):
     """Returns the name of the function f's keyword argument parameter if it exists, otherwise None"""
-    sigparams = inspect.signature(f).parameters
+    sigparams = get_signature(f).parameters
     for p in sigparams:
         if sigparams[p].kind == inspect.Parameter.VAR_KEYWORD:
             return sigparams[p].name
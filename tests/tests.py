@@ -11,6 +11,7 @@ Call using:
   $ python3 -m pytest tests.py
 """
 
+import sys
 import unittest
 from unittest import TestCase, main
 from paranoid.testfunctions import test_function as function_test
@@ -19,6 +20,8 @@ import paranoid.types as pt
 import paranoid.utils as pu
 from paranoid.settings import Settings
 from string import ascii_letters
+from io import StringIO
+from contextlib import redirect_stdout
 
 def fails(f):
     failed = False
@@ -93,6 +96,11 @@ class TestTypes(TestCase):
         pair_fails(pt.RangeOpenClosed(0, 1), pt.RangeOpen(0, 1))
         pair_fails(pt.RangeClosedOpen(0, 1), pt.RangeOpen(0, 1))
         pair_fails(pt.Range(0, 1), pt.Range(1, 2))
+        # Integers too large to convert to floats
+        assert 10**400 in pt.Integer()
+        assert 10**400 in pt.Natural1()
+        assert -10**400 not in pt.Natural0()
+        assert 1.5 not in pt.Integer()
         
     def test_ndarray(self):
         """Numpy types"""
@@ -133,6 +141,15 @@ class TestTypes(TestCase):
         pair_test(pt.TypeFactory(pt.Integer), pt.TypeFactory(pt.Integer()))
         pair_test(None, pt.Nothing)
         assert 3 in pt.TypeFactory(int)
+        assert pt.TypeFactory(pt.Integer) is pt.TypeFactory(pt.Integer)
+        # Classes which can't be hashed
+        class Meta(type):
+            def __eq__(self, other):
+                return self is other
+        class C(metaclass=Meta):
+            pass
+        assert C() in pt.TypeFactory(C)
+        assert 3 not in pt.TypeFactory(C)
     
     def test_Constant(self):
         """Constants"""
@@ -151,7 +168,30 @@ class TestTypes(TestCase):
         def f(x):
             return x
         assert function_test(f) == 0
-        
+        # Subclasses of Unchecked may still test their values
+        class Pos(pt.Unchecked):
+            def test(self, v):
+                assert v > 0
+        @pd.accepts(Pos)
+        @pd.returns(Pos)
+        def g(x):
+            return x
+        assert g(1) == 1
+        fails(lambda : g(-1))
+        assert -1 not in Pos()
+        assert -1 in pt.Unchecked()
+
+    def test_untestable(self):
+        """Functions whose argument types generate no values"""
+        for t in [pt.Unchecked, pt.Void, pt.Not(pt.Integer),
+                  pt.And(pt.Integer, pt.String)]:
+            @pd.accepts(pt.Integer, t)
+            def f(x, y):
+                return x
+            out = StringIO()
+            with redirect_stdout(out):
+                assert function_test(f) == 0
+            assert "could not be tested" in out.getvalue()
 
     def test_Nothing(self):
         """Nothing type"""
@@ -165,6 +205,22 @@ class TestTypes(TestCase):
         identity_test(pt.Boolean)
         pair_fails(123, pt.Boolean)
 
+    def test_subclass_contains(self):
+        """Subclasses of simple types which override test() are respected"""
+        class SmallConstant(pt.Constant):
+            def test(self, v):
+                super().test(v)
+                assert False
+        class OnlyTrue(pt.Boolean):
+            def test(self, v):
+                super().test(v)
+                assert v is True
+        assert 3 not in SmallConstant(3)
+        assert False not in OnlyTrue()
+        assert False not in pt.Or(OnlyTrue(), SmallConstant(3))
+        assert True in pt.Or(OnlyTrue(), SmallConstant(3))
+        assert False not in list(pt.And(pt.Boolean, OnlyTrue()).generate())
+
     def test_Function(self):
         """Function type"""
         assert (lambda x : x) in pt.Function()
@@ -182,6 +238,10 @@ class TestTypes(TestCase):
         identity_test(pt.Maybe(pt.Range(0, 10)))
         identity_test(pt.And(pt.Range(0, 10), pt.Not(pt.Range(3, 5))))
         identity_test(pt.And(pt.Range(0, 10), pt.Not(pt.Range(0, 5))))
+        # Values generated by several of the types are only generated once
+        vals = list(pt.And(pt.Natural0, pt.Range(0, 10)).generate())
+        assert len(vals) == len(set(vals))
+        assert list(pt.And(pt.List(pt.Integer), pt.List(pt.Number)).generate())
     
     def test_class_type(self):
         """The Self variable and defining types from classes"""
@@ -210,6 +270,27 @@ class TestTypes(TestCase):
         inst2 = inst.get_val()
         inst2.get_val()
 
+    def test_class_type_test_inheritance(self):
+        """Each class's _test runs once, parents first"""
+        calls = []
+        class MyClass:
+            @staticmethod
+            def _test(v):
+                calls.append("MyClass")
+        class MyClassSub(MyClass):
+            pass
+        class MyClassSubSub(MyClassSub):
+            @staticmethod
+            def _test(v):
+                calls.append("MyClassSubSub")
+                assert v.val > 0
+        inst = MyClassSubSub()
+        inst.val = 1
+        assert inst in pt.Generic(MyClassSubSub)
+        assert calls == ["MyClass", "MyClassSubSub"]
+        inst.val = 0
+        assert inst not in pt.Generic(MyClassSubSub)
+
     def test_class_type_inheritance(self):
         """Test whether inherited methods properly resolve Self"""
         @pd.paranoidclass
@@ -233,6 +314,31 @@ class TestTypes(TestCase):
         myclass_sub2 = MyClassSub2()
         myclass_sub2.f()
         myclass_sub2.g()
+        # Only the subclass uses @paranoidclass
+        class MyClass2:
+            @pd.accepts(pt.Self)
+            def f(self):
+                pass
+        @pd.paranoidclass
+        class MyClass2Sub(MyClass2):
+            pass
+        MyClass2Sub().f()
+    def test_class_type_staticmethod(self):
+        """Self is resolved in static and class methods"""
+        @pd.paranoidclass
+        class MyClass:
+            @staticmethod
+            @pd.accepts(pt.Self)
+            def f(v):
+                pass
+            @classmethod
+            @pd.returns(pt.Self)
+            def g(cls, v):
+                return v
+        MyClass.f(MyClass())
+        fails(lambda : MyClass.f(3))
+        MyClass.g(MyClass())
+        fails(lambda : MyClass.g(3))
     def test_repr(self):
         """Test whether the __repr__ correctly prints the class name"""
         assert repr(pt.Constant(3)) == "Constant(3)"
@@ -288,9 +394,11 @@ class TestUtils(TestCase):
         testfunc = lambda x : x
         assert not pu.has_fun_prop(testfunc, "pname")
         fails(lambda : pu.get_fun_prop(testfunc, "pname"))
+        assert pu.get_fun_prop(testfunc, "pname", None) is None
         pu.set_fun_prop(testfunc, "pname", "testval")
         assert pu.has_fun_prop(testfunc, "pname")
         assert pu.get_fun_prop(testfunc, "pname") == "testval"
+        assert pu.get_fun_prop(testfunc, "pname", None) == "testval"
 
     def test_poskwarg_names(self):
         """Names of positional and keyword args"""
@@ -312,6 +420,58 @@ class TestDecorators(TestCase):
             return 0
         assert simple(5, 3) == 0
         fails(lambda : simple(5, 5))
+    def test_requires_description(self):
+        """Descriptions of requirements appear in the error message"""
+        @pd.requires("x < 5", "x must be below 50%")
+        def simple(x):
+            return 0
+        try:
+            simple(10)
+        except pd.E.EntryConditionsError as e:
+            assert str(e).startswith("x must be below 50%\n")
+        else:
+            raise ValueError("Error, function did not fail")
+    def test_error_message_values(self):
+        """Error messages show the values at the time of the error"""
+        @pd.requires("len(l) < 2")
+        def simple(l):
+            return 0
+        l = [1, 2, 3]
+        try:
+            simple(l)
+        except pd.E.EntryConditionsError as e:
+            l.clear()
+            assert isinstance(e.args[0], str)
+            assert "[1, 2, 3]" in str(e)
+        else:
+            raise ValueError("Error, function did not fail")
+    def test_requires_implies(self):
+        """Test implies notation and globals in requires"""
+        @pd.requires("x > 0 --> len(l) == x")
+        @pd.requires("y < 0 <--> x == 0")
+        def simple(x, y, l):
+            return 0
+        assert simple(2, 1, [1, 2]) == 0
+        assert simple(0, -1, [1, 2]) == 0
+        fails(lambda : simple(2, 1, [1]))
+        fails(lambda : simple(0, 1, []))
+    def test_requires_multiline(self):
+        """Conditions may span several lines"""
+        @pd.requires("""x > 0 and
+                        x < 10 --> y > 0""")
+        @pd.requires("""y < 100 and
+                        y > -100""")
+        def simple(x, y):
+            return 0
+        assert simple(5, 1) == 0
+        assert simple(20, -1) == 0
+        fails(lambda : simple(5, -1))
+        fails(lambda : simple(5, 200))
+    def test_requires_backtick(self):
+        """Backticks are rejected in requires when decorating"""
+        def simple(x):
+            return 0
+        fails(lambda : pd.requires("x` > 0")(simple))
     def test_ensures(self):
         """Test the ensures decorator"""
         @pd.ensures("return > y")
@@ -338,6 +498,26 @@ class TestDecorators(TestCase):
         fails(lambda : simple(1, 6))
         assert simple(4, 2) == 4
         fails(lambda : simple(7, 3))
+    def test_ensures_string_literals(self):
+        """Special notation is not replaced inside string literals"""
+        @pd.ensures("s == 'return' --> return == 'x-->y`'")
+        def simple(s):
+            return "x-->y`" if s == "return" else s
+        assert simple("return") == "x-->y`"
+        assert simple("a") == "a"
+    @unittest.skipIf(sys.version_info < (3, 6), "Needs f-strings")
+    def test_ensures_fstring(self):
+        """Special notation is replaced inside f-string replacement fields"""
+        @pd.ensures("f'{return}' == str(x)")
+        @pd.ensures("f'{{return}}' == '{return}'")
+        def ident(x):
+            return x
+        assert ident(3) == 3
+        @pd.ensures("x > x` --> f'{return}' > f'{return`}'")
+        def digit(x):
+            return x % 10
+        digit(3)
+        fails(lambda : digit(12))
     def test_ensures_backtick(self):
         """Test backtick notation for universal quantifier"""
         @pd.ensures("x > x` --> return > return`")
@@ -398,6 +578,7 @@ class TestDecorators(TestCase):
         def not_boolean(x):
             return int(x + 3)
         not_boolean(5)
+        assert not hasattr(not_boolean, "__wrapped__")
         # Flip the order so paranoidconfig is run first
         @pd.accepts(pt.Boolean)
         @pd.returns(pt.Boolean)
@@ -412,6 +593,47 @@ class TestDecorators(TestCase):
         def not_boolean_fail(x):
             return int(x + 3)
         fails(lambda : not_boolean_fail(5))
+    def test_argument_binding(self):
+        """Positional, keyword, and default arguments are all checked"""
+        @pd.requires("x < y")
+        @pd.ensures("return == x + y")
+        def simple(x, y=10):
+            return x + y
+        assert simple(1) == 11
+        assert simple(1, 2) == 3
+        assert simple(1, y=3) == 4
+        assert simple(y=5, x=2) == 7
+        fails(lambda : simple(11))
+        fails(lambda : simple(y=1, x=2))
+        fails(lambda : simple(1, x=2))
+        fails(lambda : simple(1, z=2))
+        fails(lambda : simple(1, 2, 3))
+    def test_repeated_values(self):
+        """Types are tested again on each call"""
+        @pd.accepts(int)
+        def simple(x):
+            return x
+        assert simple(1) == 1
+        assert simple(1) == 1
+        fails(lambda : simple(1.0))
+        fails(lambda : simple(1.0))
+        # The type's test may depend on mutable state
+        allowed = [1, 2, 3]
+        @pd.accepts(pt.Set(allowed))
+        def simple2(x):
+            return x
+        assert simple2(3) == 3
+        allowed.remove(3)
+        fails(lambda : simple2(3))
+    def test_decorate_after_call(self):
+        """Checks added to a function after it was called are run"""
+        @pd.returns(pt.Integer)
+        def simple(x):
+            return x
+        assert simple(3) == 3
+        simple = pd.accepts(pt.Integer)(simple)
+        assert simple(4) == 4
+        fails(lambda : simple("a"))
     def test_with_other_decorator(self):
         """Compatibility of paranoid with other 3rd party decorators"""
         # Other decorator first
@@ -494,6 +716,19 @@ class TestSettings(TestCase):
         Settings.set(enabled=True)
         fails(lambda : not_boolean(5))
         Settings._set("enabled", prevval)
+    def test_disabled_at_definition(self):
+        """Functions defined while paranoid is disabled are not wrapped"""
+        prevval = Settings.get("enabled")
+        Settings.set(enabled=False)
+        @pd.accepts(pt.Boolean)
+        @pd.returns(pt.Boolean)
+        def not_boolean(x):
+            return int(x + 3)
+        Settings._set("enabled", prevval)
+        assert not hasattr(not_boolean, "__wrapped__")
+        assert not_boolean(5) == 8
+        # The annotations are still available for automated testing
+        assert pu.has_fun_prop(not_boolean, "argtypes")
     def test_scoping_of_namespace(self):
         """Names in 'namespace' setting overridden by same-name argument"""
         Settings.get("namespace").update({"theval" : 3})
@@ -503,6 +738,48 @@ class TestSettings(TestCase):
             pass
         func(2)
         fails(lambda : func(3))
+    def test_namespace_changed_after_definition(self):
+        """Changes to the 'namespace' setting apply to defined functions"""
+        prevval = Settings.get("namespace")
+        @pd.requires("x != forbidden")
+        def func(x):
+            pass
+        Settings.set(namespace={"forbidden" : 1})
+        func(2)
+        fails(lambda : func(1))
+        Settings.get("namespace")["forbidden"] = 2
+        func(1)
+        fails(lambda : func(2))
+        Settings.set(namespace=prevval)
+    def test_namespace_not_modified(self):
+        """Conditions don't add names to the 'namespace' setting"""
+        prevval = Settings.get("namespace")
+        Settings.set(namespace={"forbidden" : 1})
+        @pd.requires("x != forbidden")
+        @pd.requires("len(str(x)) < 3")
+        @pd.ensures("return == x")
+        def func(x):
+            return x
+        func(2)
+        fails(lambda : func(1))
+        fails(lambda : func(100))
+        assert Settings.get("namespace") == {"forbidden" : 1}
+        Settings.set(namespace=prevval)
+    def test_max_checked_calls(self):
+        """Checks stop after max_checked_calls successful calls"""
+        @pd.accepts(pt.Integer)
+        @pd.paranoidconfig(max_checked_calls=2)
+        def func(x):
+            pass
+        fails(lambda : func(1.5))
+        func(1)
+        fails(lambda : func(1.5))
+        func(2)
+        func(1.5)
+        # Raising the limit turns checking back on
+        Settings._set("max_checked_calls", 3, function=func)
+        fails(lambda : func(1.5))
+        fails(lambda : Settings._set("max_checked_calls", -1))
 
 if __name__ == '__main__':
     main()